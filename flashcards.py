@@ -1,26 +1,63 @@
 #!/usr/bin/env python3
 import argparse
+import collections
+import functools
+import hashlib
+import itertools
+import os
 import pathlib
 import re
-from typing import List, Optional
-from xml.sax.saxutils import escape
-
-import genanki
-import markdown
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
-from reportlab.platypus import Image as RLImage
-from reportlab.platypus import KeepInFrame, Paragraph, Table, TableStyle, XPreformatted
+import sqlite3
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+# genanki/markdown are only needed for --anki and reportlab only once a PDF is drawn,
+# so they are imported where used; this keeps --help and worker start-up light.
+if TYPE_CHECKING:
+    import markdown
+    from reportlab.platypus import Image as RLImage
 
 # --- Constants & Configuration ---
 ANKI_MODEL_ID = 1607392319
+MD_EXTS = ("tables", "fenced_code", "sane_lists", "nl2br")
+# Below this many cards, worker start-up costs more than it saves
+PARALLEL_MIN_CARDS = 200
+# Cards per task sent to a render worker
+PARALLEL_CHUNK_CARDS = 64
+# Bump whenever _render_pair's output changes so stale cached HTML is not reused
+RENDER_CACHE_VERSION = 1
+
+# --- Precompiled Patterns ---
+_IMG_RE = re.compile(r"!\[\[(.*?)(?:\|.*?)?\]\]")
+_BOLD_RE = re.compile(r"\*\*(.*?)\*\*")
+_ITAL_RE = re.compile(r"\*(.*?)\*")
+_CODE_INLINE_RE = re.compile(r"`(.*?)`")
+_ORDERED_LIST_RE = re.compile(r"^(\d+\.)\s")
+_LIST_ITEM_RE = re.compile(r"^[ \t]*([-*+]|\d+\.)\s+")
+_TABLE_SEP_RE = re.compile(r"^\|[\s\-:]+\|([\s\-:]+\|)*$")
+_TABLE_SEP_CELL_RE = re.compile(r"^[-:]+$")
+_HTML_TAG_RE = re.compile(r"<([A-Z][^>]*)>")
+_FENCE_INDENT_RE = re.compile(r"^([ \t]+)```")
+_CODE_BLOCK_RE = re.compile(r"^[ \t]*```[\s\S]*?^[ \t]*```", re.M)
+_DECK_RE = re.compile(r"^#\s+", re.M)
+_NON_SPACE_RE = re.compile(r"\S")
+_SECTION_RE = re.compile(r"^##\s*(.*?)\n(.*?)(?=\n##\s*|\Z)", re.M | re.S)
+_BLOCK_TAG = r"</?(?:ul|ol|li|table|thead|tbody|tr|td|th|pre|div|h[1-6]|p)[^>]*>"
+# A block tag together with every <br> directly before or after it
+_BR_SCRUB_RE = re.compile(rf"(?:<br\s*/?>\s*)*({_BLOCK_TAG})(?:\s*<br\s*/?>)*")
+
+# Suffixes ReportLab embeds by filename (no decode); see platypus.Image.__init__
+_JPEG_SUFFIXES = frozenset((".jpg", ".JPG", ".jpeg", ".JPEG"))
+
+
+def _deck_id(full_name: str) -> int:
+    # hash() is salted per process; a digest keeps the ID stable across runs
+    digest = hashlib.blake2b(full_name.encode("utf-8"), digest_size=5).digest()
+    return int.from_bytes(digest, "big") % (10**10)
 
 
 def create_anki_deck(deck_data, root_deck_name, output_path, media_files):
+    import genanki
+
     model_css = (
         ".card { text-align: center; color: black; background-color: white; font-family: Arial; font-size: 16px; } "
         ".question { margin-bottom: 20px; font-weight: bold; } "
@@ -51,47 +88,163 @@ def create_anki_deck(deck_data, root_deck_name, output_path, media_files):
     )
 
     decks = []
-    global_idx = 1
+    # Card number of each subdeck's first note, as a running total over the subdecks
+    first_idxs = itertools.accumulate((len(v) for v in deck_data.values()), initial=1)
 
-    for subdeck_name, qa_pairs in deck_data.items():
+    for (subdeck_name, qa_pairs), first_idx in zip(deck_data.items(), first_idxs):
         full_name = f"{root_deck_name}::{subdeck_name}" if subdeck_name else root_deck_name
-        deck_id = abs(hash(full_name)) % (10**10)
+        deck_id = _deck_id(full_name)
         deck = genanki.Deck(deck_id, full_name)
 
-        for q_html, a_html in qa_pairs:
-            q_final = f"<div style='display:none;'>{global_idx:04d}</div>{q_html}<br><span style='font-size: 10px; color: grey;'>ID: {global_idx}</span>"
-            note = genanki.Note(model=model, fields=[q_final, a_html])
-            deck.add_note(note)
-            global_idx += 1
+        deck.notes.extend(
+            genanki.Note(
+                model=model,
+                fields=[
+                    f"<div style='display:none;'>{idx:04d}</div>{q_html}<br><span style='font-size: 10px; color: grey;'>ID: {idx}</span>",
+                    a_html,
+                ],
+            )
+            for idx, (q_html, a_html) in enumerate(qa_pairs, first_idx)
+        )
 
         decks.append(deck)
 
     package = genanki.Package(decks)
     package.media_files = media_files
-    package.write_to_file(output_path)
+    # Large write buffer so the zip (DB + media) goes out in few syscalls
+    with open(output_path, "wb", buffering=1 << 20) as f:
+        package.write_to_file(f)
 
 
 # --- Helper Functions ---
+def _esc(text: str) -> str:
+    # Same entities as xml.sax.saxutils.escape, but skips the copy for absent characters
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def _inline_markup(text: str) -> str:
+    """Convert **bold**, *italic* and `code` to ReportLab paragraph markup."""
+    # Passes run in this order on purpose (bold before italic, both before code);
+    # each is skipped when its delimiter does not occur at all.
+    if "*" in text:
+        text = _BOLD_RE.sub(r"<b>\1</b>", text)
+        text = _ITAL_RE.sub(r"<i>\1</i>", text)
+    if "`" in text:
+        text = _CODE_INLINE_RE.sub(r'<font name="Courier">\1</font>', text)
+    return text
+
+
+class _GlyphWidths(dict):
+    """Advance widths for one font and size, measured the first time each character is seen."""
+
+    def __init__(self, font: str, size: float):
+        super().__init__()
+        self.font = font
+        self.size = size
+
+    def __missing__(self, ch: str) -> float:
+        from reportlab.pdfbase import pdfmetrics
+
+        width = self[ch] = pdfmetrics.stringWidth(ch, self.font, self.size)
+        return width
+
+
+@functools.lru_cache(maxsize=None)
+def _glyph_widths(font: str, size: float) -> _GlyphWidths:
+    return _GlyphWidths(font, size)
+
+
+def _text_width(text: str, font: str, size: float) -> float:
+    # map/sum keep the per-character accumulation in C
+    return sum(map(_glyph_widths(font, size).__getitem__, text))
+
+
 def _extract_image_names(text: str) -> List[str]:
-    return [m.split("|")[0] for m in re.findall(r"!\[\[(.*?)(?:\|.*?)?\]\]", text)]
+    # Most lines/notes have no embeds; a substring test is far cheaper than the regex
+    if "![[" not in text:
+        return []
+    # The lazy name group already stops before any "|size" suffix
+    return _IMG_RE.findall(text)
+
+
+@functools.lru_cache(maxsize=256)
+def _image_size(path_str: str) -> Tuple[int, int]:
+    from reportlab.lib.utils import ImageReader
+
+    # Only the header is read; pixel data is left to the canvas
+    return ImageReader(path_str).getSize()
 
 
+def _image_flowable(path_str: str) -> "RLImage":
+    from reportlab.platypus import Image as RLImage
+
+    img = RLImage(path_str)
+    if os.path.splitext(path_str)[1] not in _JPEG_SUFFIXES:
+        # Do what RLImage already does for JPEGs: take the size from the header and leave
+        # _img unset, so the canvas embeds the file by name once and reuses the XObject on
+        # later cards instead of re-hashing the decoded pixels on every draw.
+        img.imageWidth, img.imageHeight = _image_size(path_str)
+        img._img = None
+    return img
+
+
+@functools.lru_cache(maxsize=None)
+def _image_index(images_dir: pathlib.Path) -> frozenset:
+    # One directory listing stands in for a stat() per referenced file; scandir's entry type
+    # usually comes from the listing itself, so is_file() costs no extra syscall
+    try:
+        with os.scandir(images_dir) as entries:
+            return frozenset(entry.name for entry in entries if entry.is_file())
+    except OSError:
+        return frozenset()
+
+
+# Cards often reuse a figure and the Anki media list asks again; resolve each name once
+@functools.lru_cache(maxsize=4096)
 def _resolve_image_path(
     filename: str, images_dir: Optional[pathlib.Path]
 ) -> Optional[pathlib.Path]:
-    if images_dir and (images_dir / filename).exists():
+    if not images_dir:
+        return None
+    if filename in _image_index(images_dir):
+        return images_dir / filename
+    # Misses are rare: nested references are not in the top-level listing, and the filesystem
+    # may match names the exact listing does not (case on macOS/Windows, NFC vs NFD on APFS)
+    if os.path.isfile(os.path.join(images_dir, filename)):
         return images_dir / filename
     return None
 
 
 # --- Advanced PDF Generator (Markdown -> ReportLab Platypus) ---
 def create_pdf(questions, answers, output_pdf, images_dir=None):
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import KeepInFrame, Paragraph, Table, TableStyle, XPreformatted
+
     c = canvas.Canvas(str(output_pdf), pagesize=landscape(A4))
     page_width, page_height = landscape(A4)
 
     outer_margin = 0.25 * inch
     card_width = (page_width - (2 * outer_margin)) / 2
     card_height = (page_height - (2 * outer_margin)) / 2
+    pad = 0.25 * inch
+    frame_w = card_width - (pad * 2)
+    # Bottom-left corner of each slot in the 2x2 grid, the same on every page
+    card_origins = tuple(
+        (outer_margin + (col * card_width), page_height - outer_margin - ((row + 1) * card_height))
+        for row in range(2)
+        for col in range(2)
+    )
 
     # --- Platypus PDF Styles ---
     styles = getSampleStyleSheet()
@@ -127,6 +280,18 @@ def create_pdf(questions, answers, output_pdf, images_dir=None):
     table_text_style = ParagraphStyle(
         "TableText", parent=styles["Normal"], fontName="Helvetica", fontSize=7.5, leading=9
     )
+    table_head_style = ParagraphStyle("TblHead", parent=table_text_style, alignment=TA_CENTER)
+    table_body_style = ParagraphStyle("TblBody", parent=table_text_style, alignment=TA_LEFT)
+
+    @functools.lru_cache(maxsize=None)
+    def answer_style(indent_pts, has_bullet):
+        return ParagraphStyle(
+            "DynA",
+            parent=ans_style,
+            leftIndent=indent_pts + (12 if has_bullet else 0),
+            firstLineIndent=-12 if has_bullet else 0,
+            bulletIndent=indent_pts,
+        )
 
     table_style = TableStyle(
         [
@@ -151,12 +316,10 @@ def create_pdf(questions, answers, output_pdf, images_dir=None):
         in_table = False
         table_data = []
 
-        base_style = q_style if is_question else ans_style
         max_w = card_width - (outer_margin * 2.5)
 
-        card_num = None
-        if is_question and lines:
-            card_num = lines.pop().strip()
+        # Decide once per card whether any line can hold an embed
+        has_images = "![[" in text
 
         for line in lines:
             line_stripped = line.strip()
@@ -168,7 +331,7 @@ def create_pdf(questions, answers, output_pdf, images_dir=None):
 
                     longest_line = max(code_lines, key=len) if code_lines else ""
                     # Calculate pixel width of the longest line (accounting for tabs and padding)
-                    req_width = c.stringWidth(
+                    req_width = _text_width(
                         longest_line.replace("\t", "    "), code_style.fontName, code_style.fontSize
                     ) + (code_style.borderPadding * 2)
 
@@ -183,7 +346,7 @@ def create_pdf(questions, answers, output_pdf, images_dir=None):
                             leading=code_style.leading * scale,
                         )
 
-                    code_text = escape("\n".join(code_lines))
+                    code_text = _esc("\n".join(code_lines))
                     pre = XPreformatted(code_text, custom_code_style)
                     flowables.append(pre)
                     code_lines = []
@@ -198,20 +361,13 @@ def create_pdf(questions, answers, output_pdf, images_dir=None):
             if line_stripped.startswith("|") and line_stripped.endswith("|"):
                 in_table = True
                 row = [cell.strip() for cell in line_stripped.split("|")[1:-1]]
-                if all(re.match(r"^[-:]+$", c.replace(" ", "")) for c in row):
+                if all(_TABLE_SEP_CELL_RE.match(c.replace(" ", "")) for c in row):
                     continue
 
                 formatted_row = []
                 for c_raw in row:
-                    c_esc = escape(c_raw)
-                    c_esc = re.sub(r"\*\*(.*?)\*\*", r"<b>\1</b>", c_esc)
-                    c_esc = re.sub(r"\*(.*?)\*", r"<i>\1</i>", c_esc)
-                    c_esc = re.sub(r"`(.*?)`", r'<font name="Courier">\1</font>', c_esc)
-                    ts = ParagraphStyle(
-                        "Tbl",
-                        parent=table_text_style,
-                        alignment=TA_CENTER if not table_data else TA_LEFT,
-                    )
+                    c_esc = _inline_markup(_esc(c_raw))
+                    ts = table_body_style if table_data else table_head_style
                     formatted_row.append(Paragraph(c_esc, ts))
                 table_data.append(formatted_row)
                 continue
@@ -229,12 +385,12 @@ def create_pdf(questions, answers, output_pdf, images_dir=None):
                 continue
 
             # --- 3. Image Handling ---
-            img_names = _extract_image_names(line)
+            img_names = _extract_image_names(line) if has_images else None
             if img_names:
                 img_path = _resolve_image_path(img_names[0], images_dir)
                 if img_path:
                     try:
-                        img = RLImage(str(img_path))
+                        img = _image_flowable(str(img_path))
                         img.drawWidth = max_w * 0.8
                         img.drawHeight = (img.drawWidth / img.imageWidth) * img.imageHeight
                         if img.drawHeight > card_height * 0.5:
@@ -248,37 +404,28 @@ def create_pdf(questions, answers, output_pdf, images_dir=None):
                 continue
 
             # --- 4. Standard Text and Lists ---
-            if line_stripped.startswith("![") or line_stripped.startswith("]("):
+            if line_stripped.startswith(("![", "](")):
                 continue
 
-            indent = len(line) - len(line.lstrip())
-            clean_txt = line.strip()
+            # line_stripped is non-empty here, so its offset in line is the indent width
+            indent = line.index(line_stripped[0])
+            clean_txt = line_stripped
             bullet = None
 
-            if clean_txt.startswith("- ") or clean_txt.startswith("* "):
+            if clean_txt.startswith(("- ", "* ")):
                 bullet = "&bull;"
                 clean_txt = clean_txt[2:]
-            elif re.match(r"^\d+\.\s", clean_txt):
-                bullet = clean_txt.split(".")[0] + "."
-                clean_txt = clean_txt.split(".", 1)[1].lstrip()
+            elif ordered := _ORDERED_LIST_RE.match(clean_txt):
+                bullet = ordered.group(1)
+                clean_txt = clean_txt[ordered.end() :].lstrip()
 
-            clean_txt = escape(clean_txt)
-            clean_txt = re.sub(r"\*\*(.*?)\*\*", r"<b>\1</b>", clean_txt)
-            clean_txt = re.sub(r"\*(.*?)\*", r"<i>\1</i>", clean_txt)
-            clean_txt = re.sub(r"`(.*?)`", r'<font name="Courier">\1</font>', clean_txt)
+            clean_txt = _inline_markup(_esc(clean_txt))
 
             if is_question:
-                p_style = ParagraphStyle("DynQ", parent=base_style, alignment=TA_CENTER)
-                flowables.append(Paragraph(clean_txt, p_style))
+                # q_style is already centred, so it can be shared by every question line
+                flowables.append(Paragraph(clean_txt, q_style))
             else:
-                indent_pts = indent * 4
-                p_style = ParagraphStyle(
-                    "DynA",
-                    parent=base_style,
-                    leftIndent=indent_pts + (12 if bullet else 0),
-                    firstLineIndent=-12 if bullet else 0,
-                    bulletIndent=indent_pts,
-                )
+                p_style = answer_style(indent * 4, bool(bullet))
                 if bullet:
                     flowables.append(Paragraph(f"<bullet>{bullet}</bullet>{clean_txt}", p_style))
                 else:
@@ -291,53 +438,90 @@ def create_pdf(questions, answers, output_pdf, images_dir=None):
             t.spaceAfter = 4
             flowables.append(t)
 
-        return flowables, card_num
-
-    def draw_page(c, items, is_question_side=True):
+        return flowables
+
+    def layout_card(text, is_question, frame_w, frame_h):
+        flowables = parse_to_flowables(text, is_question)
+        # "shrink" only re-wraps when the content overflows; fitting cards take one pass
+        kif = KeepInFrame(
+            frame_w, frame_h, flowables, mode="shrink", hAlign="CENTER", vAlign="MIDDLE"
+        )
+        actual_w, actual_h = kif.wrapOn(c, frame_w, frame_h)
+        return kif, actual_w, actual_h
+
+    # Identical cards (an answer shared by several questions, a question asked twice) are laid
+    # out once. Count the texts up front so exactly the repeated ones are kept, however far
+    # apart they are.
+    repeat_counts = collections.Counter((False, a) for a in answers)
+    repeat_counts.update((True, q) for q in questions)
+    layouts = {}
+
+    def layout_cached(text, is_question, frame_w, frame_h):
+        key = (is_question, text)
+        if repeat_counts[key] < 2:
+            return layout_card(text, is_question, frame_w, frame_h)
+        if key not in layouts:
+            layouts[key] = layout_card(text, is_question, frame_w, frame_h)
+        return layouts[key]
+
+    # Cards are numbered by their position in the deck
+    id_tags = tuple(f"ID: {k}" for k in range(1, len(questions) + 1))
+
+    def draw_page(c, items, is_question_side=True, first_card=0):
         c.setLineWidth(0.5)
         c.setStrokeColor(colors.lightgrey)
+        id_labels = []
+
+        id_space = 15 if is_question_side else 0
+        frame_h = card_height - (pad * 2) - id_space
 
+        cards = []
         for i, item in enumerate(items):
             if not item and not is_question_side:
                 continue
-            row, col = i // 2, i % 2
-
-            x = outer_margin + (col * card_width)
-            y = page_height - outer_margin - ((row + 1) * card_height)
-            c.rect(x, y, card_width, card_height)
-
-            flowables, card_num = parse_to_flowables(item, is_question_side)
-
-            pad = 0.25 * inch
-            id_space = 15 if is_question_side else 0
+            x, y = card_origins[i]
+            cards.append((i, item, x, y))
 
-            frame_w = card_width - (pad * 2)
-            frame_h = card_height - (pad * 2) - id_space
+        # Stroke every card border on the page as one path, before any content changes colours
+        if cards:
+            grid = c.beginPath()
+            for _, _, x, y in cards:
+                grid.rect(x, y, card_width, card_height)
+            c.drawPath(grid, stroke=1, fill=0)
 
-            kif = KeepInFrame(
-                frame_w, frame_h, flowables, mode="shrink", hAlign="CENTER", vAlign="MIDDLE"
-            )
-            actual_w, actual_h = kif.wrapOn(c, frame_w, frame_h)
+        for i, item, x, y in cards:
+            kif, actual_w, actual_h = layout_cached(item, is_question_side, frame_w, frame_h)
 
             draw_x = x + pad + (frame_w - actual_w) / 2
             draw_y = y + pad + id_space + (frame_h - actual_h) / 2
 
             kif.drawOn(c, draw_x, draw_y)
 
-            if is_question_side and card_num:
-                c.setFont("Helvetica", 9)
-                c.setFillColor(colors.grey)
-                c.drawCentredString(x + card_width / 2, y + 10, f"ID: {card_num}")
-                c.setFillColor(colors.black)
-
+            if is_question_side:
+                id_labels.append((x + card_width / 2, y + 10, id_tags[first_card + i]))
+
+        # Draw all ID labels as one text object under a single font/colour state
+        if id_labels:
+            text = c.beginText()
+            text.setFont("Helvetica", 9)
+            for label_x, label_y, label in id_labels:
+                text.setTextOrigin(label_x - _text_width(label, "Helvetica", 9) / 2, label_y)
+                text.textOut(label)
+            c.setFillColor(colors.grey)
+            c.drawText(text)
+            c.setFillColor(colors.black)
+
+    # Pad the answers once so every page can slice a full batch of four
+    slots = -(-len(questions) // 4) * 4
+    answers = list(answers) + [""] * (slots - len(answers))
+
+    # Backs are mirrored left-to-right for duplex printing, so each row's pair is swapped
+    ans_batch = [""] * 4
     for i in range(0, len(questions), 4):
-        draw_page(c, questions[i : i + 4], True)
+        draw_page(c, questions[i : i + 4], True, i)
         c.showPage()
-        ans_batch = [answers[j] if j < len(answers) else "" for j in range(i, i + 4)]
-        if len(ans_batch) >= 2:
-            ans_batch[0], ans_batch[1] = ans_batch[1], ans_batch[0]
-            if len(ans_batch) == 4:
-                ans_batch[2], ans_batch[3] = ans_batch[3], ans_batch[2]
+        ans_batch[0], ans_batch[1] = answers[i + 1], answers[i]
+        ans_batch[2], ans_batch[3] = answers[i + 3], answers[i + 2]
         draw_page(c, ans_batch, False)
         c.showPage()
 
@@ -346,8 +530,9 @@ def create_pdf(questions, answers, output_pdf, images_dir=None):
 
 # --- Markdown Preprocessor (For Anki HTML) ---
 def preprocess_markdown(text):
-    text = re.sub(r"!\[\[(.*?)(?:\|.*?)?\]\]", r"![](\1)", text)
-    text = re.sub(r"<([A-Z][^>]*)>", r"&lt;\1&gt;", text)
+    if "![[" in text:
+        text = _IMG_RE.sub(r"![](\1)", text)
+    text = _HTML_TAG_RE.sub(r"&lt;\1&gt;", text)
 
     lines = text.split("\n")
     cleaned_lines = []
@@ -370,7 +555,7 @@ def preprocess_markdown(text):
 
         # Clean Table Separators
         if line_stripped.startswith("|") and line_stripped.endswith("|"):
-            is_sep = re.match(r"^\|[\s\-:]+\|([\s\-:]+\|)*$", line_stripped)
+            is_sep = _TABLE_SEP_RE.match(line_stripped)
             if not in_table:
                 in_table = True
                 header_sep_seen = False
@@ -387,11 +572,11 @@ def preprocess_markdown(text):
             in_table = False
 
             # Ensure lists have a preceding blank line
-            is_list_item = re.match(r"^[ \t]*([-*+]|\d+\.)\s+", line)
+            is_list_item = _LIST_ITEM_RE.match(line)
             if is_list_item and i > 0:
                 prev_line_orig = lines[i - 1]
                 prev_line_stripped = prev_line_orig.strip()
-                is_prev_list_item = re.match(r"^[ \t]*([-*+]|\d+\.)\s+", prev_line_orig)
+                is_prev_list_item = _LIST_ITEM_RE.match(prev_line_orig)
 
                 if (
                     prev_line_stripped
@@ -408,7 +593,7 @@ def preprocess_markdown(text):
     # Dedent ASCII architecture blocks
     def dedent_code(match):
         block = match.group(0)
-        m = re.match(r"^([ \t]+)```", block)
+        m = _FENCE_INDENT_RE.match(block)
         if not m:
             return block
         indent_str = m.group(1)
@@ -422,16 +607,155 @@ def preprocess_markdown(text):
                 dedented.append(line)
         return "\n".join(dedented)
 
-    text = re.sub(r"^[ \t]*```[\s\S]*?^[ \t]*```", dedent_code, text, flags=re.M)
+    text = _CODE_BLOCK_RE.sub(dedent_code, text)
     return text
 
 
+def _iter_subdecks(content: str) -> Iterator[Tuple[str, int, int]]:
+    """Yield (subdeck name, body start, body end) for each "# " section of content.
+
+    Sections are reported as spans so their bodies can be scanned in place
+    rather than copied out with re.split.
+    """
+
+    def section(start, end):
+        if not _NON_SPACE_RE.search(content, start, end):
+            return None
+        newline = content.find("\n", start, end)
+        if newline == -1:
+            return content[start:end].strip(), end, end
+        return content[start:newline].strip(), newline + 1, end
+
+    start = 0
+    for m in _DECK_RE.finditer(content):
+        span = section(start, m.start())
+        if span:
+            yield span
+        start = m.end()
+    span = section(start, len(content))
+    if span:
+        yield span
+
+
+@functools.lru_cache(maxsize=None)
+def _markdown_engine() -> "markdown.Markdown":
+    import markdown
+
+    # One converter per process (workers included) so extensions load only once
+    return markdown.Markdown(extensions=MD_EXTS)
+
+
+def _render_pair(q_raw, a_raw):
+    q_prep = preprocess_markdown(q_raw.strip())
+    a_prep = preprocess_markdown(a_raw.strip())
+
+    md = _markdown_engine()
+    q_html = md.reset().convert(q_prep)
+    a_html = md.reset().convert(a_prep)
+
+    # Post-Process HTML: Scrub <br> tags injected by nl2br
+    q_html = _BR_SCRUB_RE.sub(r"\1", q_html)
+    a_html = _BR_SCRUB_RE.sub(r"\1", a_html)
+    return q_html, a_html
+
+
+def _render_keys(pairs) -> List[bytes]:
+    import markdown
+
+    # Everything that changes the HTML besides the card text is hashed once and copied per card
+    seed = hashlib.blake2b(digest_size=16)
+    seed.update(f"{RENDER_CACHE_VERSION}\0{markdown.__version__}\0{','.join(MD_EXTS)}\0".encode())
+    keys = []
+    for q_raw, a_raw in pairs:
+        h = seed.copy()
+        h.update(q_raw.encode("utf-8"))
+        h.update(b"\0")
+        h.update(a_raw.encode("utf-8"))
+        keys.append(h.digest())
+    return keys
+
+
+def _render_pairs(pairs, cache_path=None):
+    """Render (question, answer) markdown pairs to Anki HTML, in input order.
+
+    With a cache_path, HTML for unchanged cards is read from an SQLite cache and
+    only new or edited cards are rendered; rows for cards no longer present are
+    dropped. The cache is only an optimisation: if it cannot be opened, read or
+    written, every card is rendered as without one.
+    """
+    conn = None
+    keys = []
+    rendered = {}
+    if cache_path is not None:
+        try:
+            conn = sqlite3.connect(str(cache_path))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache"
+                "(src_hash BLOB PRIMARY KEY, q_html TEXT, a_html TEXT)"
+            )
+            keys = _render_keys(pairs)
+            # The deck's keys go into a temp table so all hits come back from one join
+            with conn:
+                conn.execute("CREATE TEMP TABLE live(src_hash BLOB PRIMARY KEY)")
+                conn.executemany("INSERT OR IGNORE INTO live VALUES (?)", [(k,) for k in keys])
+            hits = {
+                key: (q_html, a_html)
+                for key, q_html, a_html in conn.execute(
+                    "SELECT src_hash, q_html, a_html FROM cache JOIN live USING (src_hash)"
+                )
+            }
+            rendered = {i: hits[key] for i, key in enumerate(keys) if key in hits}
+        except sqlite3.Error as exc:
+            print(f"Warnung: HTML-Cache {cache_path} wird übersprungen ({exc})")
+            if conn is not None:
+                conn.close()
+            conn, keys, rendered = None, [], {}
+
+    todo = [i for i in range(len(pairs)) if i not in rendered]
+    if len(todo) >= PARALLEL_MIN_CARDS:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Fork no more workers than there are chunks to hand out
+        workers = min(os.cpu_count() or 1, -(-len(todo) // PARALLEL_CHUNK_CARDS))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            fresh = ex.map(
+                _render_pair, *zip(*(pairs[i] for i in todo)), chunksize=PARALLEL_CHUNK_CARDS
+            )
+            rendered.update(zip(todo, fresh))
+    else:
+        for i in todo:
+            rendered[i] = _render_pair(*pairs[i])
+
+    if conn is not None:
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                    [(keys[i], *rendered[i]) for i in todo],
+                )
+                conn.execute("DELETE FROM cache WHERE src_hash NOT IN (SELECT src_hash FROM live)")
+        except sqlite3.Error as exc:
+            # The cards are already rendered; only the next run loses the saved HTML
+            print(f"Warnung: HTML-Cache {cache_path} wurde nicht gespeichert ({exc})")
+        finally:
+            conn.close()
+
+    return [tuple(rendered[i]) for i in range(len(pairs))]
+
+
 # --- Main Logic ---
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("file", help="Path to your Markdown file")
     parser.add_argument("--anki", action="store_true", help="Enable Anki .apkg generation")
     parser.add_argument("-n", "--name", help="Custom output filename")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-render every card instead of using the HTML cache",
+    )
     args = parser.parse_args()
 
     input_file = pathlib.Path(args.file).resolve()
@@ -439,51 +763,35 @@ def main():
     output_stem = args.name if args.name else input_file.stem
 
     with open(input_file, "r", encoding="utf-8") as f:
-        content = f.read().replace("\r\n", "\n")
+        # Text mode (universal newlines) already turns \r\n into \n
+        content = f.read()
 
-    md_exts = ["tables", "fenced_code", "sane_lists", "nl2br"]
-    sections = re.split(r"^#\s+", content, flags=re.M)
-    deck_data = {}
+    subdecks = []
     pdf_qs, pdf_ans = [], []
 
-    for section in sections:
-        if not section.strip():
-            continue
-        lines = section.split("\n", 1)
-        subdeck_name = lines[0].strip()
-        body = lines[1] if len(lines) > 1 else ""
-
-        matches = re.findall(r"^##\s*(.*?)\n(.*?)(?=\n##\s*|\Z)", body, re.M | re.S)
+    for subdeck_name, body_start, body_end in _iter_subdecks(content):
+        matches = _SECTION_RE.findall(content, body_start, body_end)
         if matches:
-            rendered_pairs = []
+            subdecks.append((subdeck_name, matches))
             for q_raw, a_raw in matches:
-                q_prep = preprocess_markdown(q_raw.strip())
-                a_prep = preprocess_markdown(a_raw.strip())
-
-                q_html = markdown.markdown(q_prep, extensions=md_exts)
-                a_html = markdown.markdown(a_prep, extensions=md_exts)
-
-                # Post-Process HTML: Scrub <br> tags injected by nl2br
-                block_tags = r"ul|ol|li|table|thead|tbody|tr|td|th|pre|div|h[1-6]|p"
-                for _ in range(2):
-                    q_html = re.sub(rf"(</?(?:{block_tags})[^>]*>)\s*<br\s*/?>", r"\1", q_html)
-                    a_html = re.sub(rf"(</?(?:{block_tags})[^>]*>)\s*<br\s*/?>", r"\1", a_html)
-                    q_html = re.sub(rf"<br\s*/?>\s*(</?(?:{block_tags})[^>]*>)", r"\1", q_html)
-                    a_html = re.sub(rf"<br\s*/?>\s*(</?(?:{block_tags})[^>]*>)", r"\1", a_html)
-
-                rendered_pairs.append((q_html, a_html))
-
-                pdf_qs.append(f"{q_raw.strip()}\n{len(pdf_qs) + 1}")
+                pdf_qs.append(q_raw.strip())
                 pdf_ans.append(a_raw.strip())
 
-            deck_data[subdeck_name] = rendered_pairs
-
     if args.anki:
+        pairs = [pair for _, matches in subdecks for pair in matches]
+        cache_path = None if args.no_cache else input_file.with_suffix(".mdcache.sqlite")
+        rendered = _render_pairs(pairs, cache_path)
+
+        rendered_iter = iter(rendered)
+        deck_data = {}
+        for subdeck_name, matches in subdecks:
+            deck_data[subdeck_name] = [next(rendered_iter) for _ in matches]
+
         media = []
         if img_dir.exists():
-            media = [
-                str(img_dir / n) for n in _extract_image_names(content) if (img_dir / n).exists()
-            ]
+            names = dict.fromkeys(_extract_image_names(content))
+            resolved = (_resolve_image_path(n, img_dir) for n in names)
+            media = [str(p) for p in resolved if p]
 
         apkg_path = input_file.with_name(f"{output_stem}.apkg")
         create_anki_deck(deck_data, output_stem, apkg_path, media)